@@ -0,0 +1,120 @@
+"""
+Cache Helper Functions
+
+Redis-backed response cache and OTP store shared by all workers.
+If REDIS_URL is not set, caching is skipped and OTPs fall back to process memory.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, Tuple
+from functools import wraps
+
+from dotenv import load_dotenv
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from responses import json_dumps
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+redis = None
+
+redis_url = os.getenv("REDIS_URL")
+
+if redis_url:
+    # Short timeouts so a stalled Redis degrades to cache misses, not slow requests
+    redis = Redis.from_url(redis_url, socket_timeout=1, socket_connect_timeout=1)
+
+# Atomic compare-and-delete so concurrent verifies can't both accept one OTP;
+# a wrong code leaves the stored OTP in place
+_CONSUME_OTP_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+_consume_otp_script = redis.register_script(_CONSUME_OTP_LUA) if redis is not None else None
+
+# Cache counters for this worker, reported by /test
+CACHE_STATS = {"hits": 0, "misses": 0}
+
+# Fallback OTP store when Redis is not configured (single worker only):
+# phone -> (code, monotonic expiry)
+_LOCAL_OTP: Dict[str, Tuple[str, float]] = {}
+
+def _cache_key(name: str, params: dict) -> str:
+    raw = json.dumps([name, sorted((k, v) for k, v in params.items() if v is not None)], default=str)
+    return "cache:" + hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+async def _cache_set(key: str, body: bytes, ttl: int):
+    try:
+        await redis.set(key, body, ex=ttl)
+    except RedisError as e:
+        logger.warning("Cache set failed for %s: %s", key, e)
+
+async def _tee_to_cache(chunks, key: str, ttl: int):
+    # Pass chunks through to the client, caching the full body once complete
+    parts = []
+    async for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    await _cache_set(key, b"".join(parts), ttl)
+
+def cached(ttl: int = 30):
+    """Cache a GET endpoint's JSON response in Redis keyed on its query params.
+
+    Fails open: Redis errors are logged and treated as misses.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(**kwargs):
+            if redis is None:
+                return await func(**kwargs)
+
+            key = _cache_key(func.__name__, kwargs)
+            try:
+                body = await redis.get(key)
+            except RedisError as e:
+                logger.warning("Cache get failed for %s: %s", key, e)
+                body = None
+            if body is not None:
+                CACHE_STATS["hits"] += 1
+                return Response(content=body, media_type="application/json")
+
+            CACHE_STATS["misses"] += 1
+            result = await func(**kwargs)
+            if isinstance(result, StreamingResponse):
+                result.body_iterator = _tee_to_cache(result.body_iterator, key, ttl)
+                return result
+            body = result.body if isinstance(result, Response) else json_dumps(result)
+            await _cache_set(key, body, ttl)
+            return Response(content=body, media_type="application/json")
+        return wrapper
+    return decorator
+
+async def store_otp(phone: str, code: str, ttl: int = 300):
+    """Save an OTP for a phone number with expiry"""
+    if redis is None:
+        _LOCAL_OTP[phone] = (code, time.monotonic() + ttl)
+        return
+    await redis.set(f"otp:{phone}", code, ex=ttl)
+
+async def consume_otp(phone: str, code: str) -> bool:
+    """Check an OTP and delete it on success"""
+    if redis is None:
+        record = _LOCAL_OTP.get(phone)
+        if not record or record[0] != code or record[1] <= time.monotonic():
+            return False
+        del _LOCAL_OTP[phone]
+        return True
+
+    return await _consume_otp_script(keys=[f"otp:{phone}"], args=[code]) == 1
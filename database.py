@@ -3,53 +3,184 @@ Database Helper Functions
 
 MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
+All helpers are coroutines backed by Motor, so await them from async endpoints.
 """
 
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
 from datetime import datetime, timezone
+import hashlib
 import os
+import types
 from dotenv import load_dotenv
-from typing import Union
+from typing import AsyncIterator, Dict, List, Optional, Union, get_args, get_origin
 from pydantic import BaseModel
+from pymongo.errors import BulkWriteError
 
 # Load environment variables from .env file
 load_dotenv()
 
 _client = None
 db = None
+fs = None
+
+MEDIA_BUCKET = "media"
 
 database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
 if database_url and database_name:
-    _client = MongoClient(database_url)
+    # zstd (via the zstandard package) is preferred, with zlib as the
+    # stdlib fallback; the server picks the first one it also supports.
+    # minPoolSize keeps warm connections so cold requests skip the handshake.
+    _client = AsyncIOMotorClient(
+        database_url,
+        compressors="zstd,zlib",
+        zlibCompressionLevel=6,
+        maxPoolSize=100,
+        minPoolSize=10,
+        retryWrites=True,
+    )
     db = _client[database_name]
+    fs = AsyncIOMotorGridFSBucket(db, bucket_name=MEDIA_BUCKET)
+
+# Field types whose validated values model_dump() returns unchanged
+_SCALAR_TYPES = (str, int, float, bool, bytes, datetime, type(None))
+# Model class -> whether dict(obj.__dict__) matches model_dump(); decided once per class
+_FLAT_MODELS: Dict[type, bool] = {}
+
+def _is_scalar(annotation) -> bool:
+    if annotation in _SCALAR_TYPES:
+        return True
+    if get_origin(annotation) in (Union, types.UnionType):
+        return all(_is_scalar(arg) for arg in get_args(annotation))
+    return False
+
+def _is_flat(model_cls: type) -> bool:
+    flat = _FLAT_MODELS.get(model_cls)
+    if flat is None:
+        decorators = model_cls.__pydantic_decorators__
+        flat = (
+            not model_cls.model_computed_fields
+            and not decorators.field_serializers
+            and not decorators.model_serializers
+            and model_cls.model_config.get("extra") != "allow"
+            and all(not field.exclude and _is_scalar(field.annotation) for field in model_cls.model_fields.values())
+        )
+        _FLAT_MODELS[model_cls] = flat
+    return flat
+
+def _to_document(data: Union[BaseModel, dict]) -> dict:
+    """Convert a model or dict to a fresh dict for insertion"""
+    if not isinstance(data, BaseModel):
+        return data.copy()
+    # Flat models already hold their validated values in __dict__, so copying
+    # it skips model_dump()'s serializer pass
+    if _is_flat(type(data)):
+        return dict(data.__dict__)
+    return data.model_dump()
 
 # Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
+async def create_document(collection_name: str, data: Union[BaseModel, dict]):
     """Insert a single document with timestamp"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
 
-    # Convert Pydantic model to dict if needed
-    if isinstance(data, BaseModel):
-        data_dict = data.model_dump()
-    else:
-        data_dict = data.copy()
-
+    data_dict = _to_document(data)
     data_dict['created_at'] = datetime.now(timezone.utc)
     data_dict['updated_at'] = datetime.now(timezone.utc)
 
-    result = db[collection_name].insert_one(data_dict)
+    result = await db[collection_name].insert_one(data_dict)
     return str(result.inserted_id)
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
-    """Get documents from collection"""
+async def create_documents(collection_name: str, items: List[Union[BaseModel, dict]]):
+    """Insert documents with timestamps in one unordered batch.
+
+    Returns one (inserted_id, error) pair per item, in input order.
+    """
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+    if not items:
+        return []
+
+    now = datetime.now(timezone.utc)
+    docs = []
+    for data in items:
+        data_dict = _to_document(data)
+        data_dict['created_at'] = now
+        data_dict['updated_at'] = now
+        docs.append(data_dict)
+
+    errors = {}
+    try:
+        # insert_many assigns _id on each dict client-side before sending
+        await db[collection_name].insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        for err in e.details.get("writeErrors", []):
+            errors[err["index"]] = err.get("errmsg", "Write failed")
+
+    return [(None, errors[i]) if i in errors else (str(doc["_id"]), None) for i, doc in enumerate(docs)]
+
+def find_documents(collection_name: str, filter_dict: dict = None, limit: int = None, projection: dict = None, skip: int = 0, sort: list = None):
+    """Get a cursor over documents in collection for async iteration.
+
+    No sort is applied unless requested; pass one only when an index whose
+    prefix matches the filter ends in the sort key, or Mongo sorts in memory.
+    """
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
-    
-    cursor = db[collection_name].find(filter_dict or {})
-    if limit:
-        cursor = cursor.limit(limit)
-    
-    return list(cursor)
+
+    return db[collection_name].find(filter_dict or {}, projection, skip=skip, limit=limit or 0, sort=sort)
+
+async def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None, projection: dict = None, skip: int = 0):
+    """Get documents from collection, optionally projected and paginated"""
+    cursor = find_documents(collection_name, filter_dict, limit=limit, projection=projection, skip=skip)
+    return await cursor.to_list(length=limit)
+
+async def store_file(chunks: AsyncIterator[bytes], filename: str, mime_type: Optional[str] = None):
+    """Stream file chunks into GridFS.
+
+    Returns (file_id, info) where info holds storage_url, size_bytes and sha256;
+    pass file_id to delete_file if the metadata that references it isn't saved.
+    """
+    if fs is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    digest = hashlib.sha256()
+    size = 0
+    grid_in = fs.open_upload_stream(filename, metadata={"contentType": mime_type})
+    try:
+        async for chunk in chunks:
+            digest.update(chunk)
+            size += len(chunk)
+            await grid_in.write(chunk)
+    except Exception:
+        await grid_in.abort()
+        raise
+    await grid_in.close()
+
+    return grid_in._id, {
+        "storage_url": f"gridfs://{MEDIA_BUCKET}/{grid_in._id}",
+        "size_bytes": size,
+        "sha256": digest.hexdigest(),
+    }
+
+async def delete_file(file_id):
+    """Remove a stored file from GridFS"""
+    if fs is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    await fs.delete(file_id)
+
+async def ensure_indexes():
+    """Create indexes matching the filter shapes used by the list endpoints"""
+    if db is None:
+        return
+
+    # (state, district) also serves state-only queries via its prefix
+    await db.beneficiary.create_index([("state", 1), ("district", 1)])
+    # Also serves find({"upload_id": x}).sort("_id", -1) without an in-memory sort
+    await db.review.create_index([("upload_id", 1), ("_id", -1)])
+    await db.review.create_index([("reviewer_phone", 1)])
+    await db.mediaupload.create_index([("beneficiary_phone", 1), ("captured_at", 1)])
+    # Last, since it fails on existing duplicate phones and would skip the rest
+    await db.beneficiary.create_index([("phone", 1)], unique=True)
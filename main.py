@@ -1,15 +1,46 @@
 import os
-from datetime import datetime, timezone
+import time
+import asyncio
+import logging
+import base64
+from datetime import datetime
 from typing import List, Optional
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File, Form, Query
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError, PyMongoError, WriteError
 
-from database import db, create_document, get_documents
-from schemas import Beneficiary, Officer, MediaUpload, Review, OTPRequest, OTPVerify, SyncPayload
+from database import db, create_document, create_documents, find_documents, store_file, delete_file, ensure_indexes
+from responses import MongoJSONResponse, stream_json_array
+from middleware import UploadGuardMiddleware
+from cache import cached, store_otp, consume_otp, CACHE_STATS
+from schemas import Beneficiary, Officer, MediaUpload, Review, OTPRequest, OTPVerify, SYNC_PAYLOAD, SYNC_PAYLOAD_SCHEMA
 
-app = FastAPI(title="Loan Utilization Tracker API")
+# App logs default to WARNING; use %s-style args so disabled levels skip formatting.
+# Per-request access logging belongs at the load balancer, not here.
+# Only names uvicorn accepts (trace maps to DEBUG for stdlib logging)
+LOG_LEVELS = {"critical": logging.CRITICAL, "error": logging.ERROR, "warning": logging.WARNING,
+              "info": logging.INFO, "debug": logging.DEBUG, "trace": logging.DEBUG}
+_requested_log_level = os.getenv("LOG_LEVEL", "warning").lower()
+LOG_LEVEL = _requested_log_level if _requested_log_level in LOG_LEVELS else "warning"
+logging.basicConfig(level=LOG_LEVELS[LOG_LEVEL], format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger("loan_tracker")
+if LOG_LEVEL != _requested_log_level:
+    logger.warning("Unsupported LOG_LEVEL %r, using warning", _requested_log_level)
+
+app = FastAPI(title="Loan Utilization Tracker API", default_response_class=MongoJSONResponse)
+
+# Body limits for media endpoints, enforced before the body is parsed
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 50 * 1024 * 1024))
+MAX_SYNC_BYTES = int(os.getenv("MAX_SYNC_BYTES", 200 * 1024 * 1024))
+
+app.add_middleware(
+    UploadGuardMiddleware,
+    limits={"/uploads": MAX_UPLOAD_BYTES, "/sync": MAX_SYNC_BYTES},
+    multipart_paths=("/uploads",),
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,33 +50,83 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Simple in-memory OTP store for demo; in production use SMS provider and expiry
-OTP_STORE = {}
+# List endpoints return schema fields only (no created_at/updated_at) and are paginated
+BENEFICIARY_FIELDS = {name: 1 for name in Beneficiary.model_fields}
+REVIEW_FIELDS = {name: 1 for name in Review.model_fields}
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Strong references so pending background tasks aren't garbage collected
+_background_tasks = set()
+
+async def _create_indexes():
+    # Index failures (duplicate phones in existing data, Mongo unreachable at
+    # boot) are logged; /test reports DB problems
+    try:
+        await ensure_indexes()
+    except PyMongoError as e:
+        logger.error("Index creation failed: %s", e)
+
+@app.on_event("startup")
+async def create_indexes():
+    # Not awaited: server selection or a large index build can outlast
+    # gunicorn's worker timeout, and workers send no heartbeat until startup ends
+    task = asyncio.create_task(_create_indexes())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Loan Utilization Tracker Backend Running"}
 
+# Env status is fixed for the process; collection names are refreshed every
+# COLLECTIONS_TTL seconds so frequent polling doesn't hit Mongo each time
+DATABASE_URL_STATUS = "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set"
+DATABASE_NAME_STATUS = "✅ Set" if os.getenv("DATABASE_NAME") else "❌ Not Set"
+COLLECTIONS_TTL = 30
+_collections_cache = {"names": None, "expires_at": 0.0}
+
+async def _collections():
+    now = time.monotonic()
+    if _collections_cache["names"] is None or now >= _collections_cache["expires_at"]:
+        _collections_cache["names"] = (await db.list_collection_names())[:10]
+        _collections_cache["expires_at"] = now + COLLECTIONS_TTL
+    return _collections_cache["names"]
+
+# Liveness probe for load balancers: never touches the database
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+# Readiness probe: checks Mongo via the cached collection listing
+@app.get("/ready")
+async def ready():
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not configured")
+    try:
+        await _collections()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Database error: {str(e)[:50]}")
+    return {"status": "ready"}
+
 @app.get("/test")
-def test_database():
+async def test_database():
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
-        "database_url": None,
-        "database_name": None,
+        "database_url": DATABASE_URL_STATUS,
+        "database_name": DATABASE_NAME_STATUS,
         "connection_status": "Not Connected",
-        "collections": []
+        "collections": [],
+        "cache": dict(CACHE_STATS),
     }
 
     try:
         if db is not None:
             response["database"] = "✅ Available"
-            response["database_url"] = "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set"
-            response["database_name"] = db.name if hasattr(db, 'name') else "✅ Connected"
             response["connection_status"] = "Connected"
             try:
-                collections = db.list_collection_names()
-                response["collections"] = collections[:10]
+                response["collections"] = await _collections()
                 response["database"] = "✅ Connected & Working"
             except Exception as e:
                 response["database"] = f"⚠️  Connected but Error: {str(e)[:50]}"
@@ -54,33 +135,40 @@ def test_database():
     except Exception as e:
         response["database"] = f"❌ Error: {str(e)[:50]}"
 
-    response["database_url"] = "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set"
-    response["database_name"] = "✅ Set" if os.getenv("DATABASE_NAME") else "❌ Not Set"
     return response
 
 # Auth Endpoints (mobile number based)
 @app.post("/auth/request-otp")
-def request_otp(payload: OTPRequest):
+async def request_otp(payload: OTPRequest):
     # Generate a simple fixed OTP for demo; replace with SMS service
     code = "123456"
-    OTP_STORE[payload.phone] = {"code": code, "created_at": datetime.now(timezone.utc)}
+    await store_otp(payload.phone, code)
     return {"sent": True, "code": code}
 
 @app.post("/auth/verify-otp")
-def verify_otp(payload: OTPVerify):
-    record = OTP_STORE.get(payload.phone)
-    if not record or record["code"] != payload.code:
+async def verify_otp(payload: OTPVerify):
+    if not await consume_otp(payload.phone, payload.code):
         raise HTTPException(status_code=401, detail="Invalid OTP")
     return {"token": f"demo-token-{payload.phone}", "phone": payload.phone}
 
 # Beneficiary CRUD (ingestion by State Agency/Bank)
 @app.post("/beneficiaries")
-def create_beneficiary(item: Beneficiary):
-    inserted_id = create_document("beneficiary", item)
+async def create_beneficiary(item: Beneficiary):
+    try:
+        inserted_id = await create_document("beneficiary", item)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Beneficiary with this phone already exists")
     return {"id": inserted_id}
 
 @app.get("/beneficiaries")
-def list_beneficiaries(state: Optional[str] = None, district: Optional[str] = None, phone: Optional[str] = None):
+@cached(ttl=30)
+async def list_beneficiaries(
+    state: Optional[str] = None,
+    district: Optional[str] = None,
+    phone: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    skip: int = Query(0, ge=0),
+):
     filters = {}
     if state:
         filters["state"] = state
@@ -88,40 +176,164 @@ def list_beneficiaries(state: Optional[str] = None, district: Optional[str] = No
         filters["district"] = district
     if phone:
         filters["phone"] = phone
-    docs = get_documents("beneficiary", filters)
-    for d in docs:
-        d["_id"] = str(d.get("_id"))
-    return docs
+    cursor = find_documents("beneficiary", filters, limit=limit, projection=BENEFICIARY_FIELDS, skip=skip)
+    # Streamed straight from the cursor so documents are never all in memory
+    return await stream_json_array(cursor)
 
 # Media uploads (geo-tagged, time-stamped)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+BASE64_CHUNK_SIZE = 1024 * 1024
+
+async def _file_chunks(file: UploadFile):
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+async def _discard_file(file_id, storage_url: Optional[str] = None):
+    # Best-effort cleanup so failed metadata writes don't leave orphaned files.
+    # Pass storage_url when the insert outcome is unknown (e.g. a network error
+    # after the server applied it): the file is then kept if any document
+    # references it, since metadata pointing at a deleted file is worse
+    try:
+        if storage_url is not None:
+            if await db.mediaupload.find_one({"storage_url": storage_url}, {"_id": 1}) is not None:
+                return
+        await delete_file(file_id)
+    except Exception as e:
+        logger.error("Failed to delete orphaned file %s: %s", file_id, e)
+
+async def _base64_chunks(data: str):
+    # Accepts data: URIs and line-wrapped input (MIME, Android Base64.DEFAULT):
+    # whitespace is dropped per slice and any partial 4-char group is carried
+    # into the next slice so every decode call sees whole groups
+    if data.startswith("data:"):
+        data = data[data.find(",") + 1:]
+    carry = ""
+    for start in range(0, len(data), BASE64_CHUNK_SIZE):
+        part = carry + "".join(data[start:start + BASE64_CHUNK_SIZE].split())
+        cut = len(part) - len(part) % 4
+        carry = part[cut:]
+        if cut:
+            yield base64.b64decode(part[:cut])
+    if carry:
+        raise ValueError("Invalid base64 data: truncated input")
+
 @app.post("/uploads")
-def create_upload(item: MediaUpload):
+async def create_upload(
+    file: UploadFile = File(...),
+    beneficiary_phone: str = Form(...),
+    loan_id: Optional[str] = Form(None),
+    latitude: Optional[float] = Form(None),
+    longitude: Optional[float] = Form(None),
+    accuracy: Optional[float] = Form(None),
+    captured_at: Optional[datetime] = Form(None),
+    notes: Optional[str] = Form(None),
+):
     # Basic validation: require some geo or timestamp
-    if not item.latitude or not item.longitude:
+    if not latitude or not longitude:
         raise HTTPException(status_code=400, detail="Location is required")
-    inserted_id = create_document("mediaupload", item)
+    file_name = file.filename or "upload"
+    mime_type = file.content_type or "application/octet-stream"
+    file_id, stored = await store_file(_file_chunks(file), file_name, mime_type)
+    try:
+        item = MediaUpload(
+            beneficiary_phone=beneficiary_phone,
+            loan_id=loan_id,
+            file_name=file_name,
+            mime_type=mime_type,
+            latitude=latitude,
+            longitude=longitude,
+            accuracy=accuracy,
+            captured_at=captured_at,
+            notes=notes,
+            **stored,
+        )
+    except ValidationError:
+        await _discard_file(file_id)
+        raise
+    try:
+        inserted_id = await create_document("mediaupload", item)
+    except WriteError:
+        # Server rejected the document (e.g. DuplicateKeyError): nothing was written
+        await _discard_file(file_id)
+        raise
+    except Exception:
+        await _discard_file(file_id, stored["storage_url"])
+        raise
     return {"id": inserted_id}
 
-@app.post("/sync")
-def sync_offline(payload: SyncPayload):
-    # Accept list of uploads created offline
-    results = []
-    for it in payload.items:
+@app.post(
+    "/sync",
+    openapi_extra={"requestBody": {"required": True, "content": {"application/json": {"schema": SYNC_PAYLOAD_SCHEMA}}}},
+)
+async def sync_offline(request: Request):
+    # Accept list of uploads created offline ({"items": [...]}, see SyncPayload);
+    # base64 data is decoded slice by slice straight into storage and only
+    # metadata is kept in Mongo
+    try:
+        items = SYNC_PAYLOAD.validate_json(await request.body()).items
+    except ValidationError as e:
+        # Same 422 body FastAPI produces for a declared SyncPayload parameter
+        raise RequestValidationError(
+            [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)]
+        )
+
+    results = [None] * len(items)
+    stored_items = []
+    stored_indexes = []
+    stored_file_ids = []
+    for i, it in enumerate(items):
+        file_id = None
         try:
-            inserted_id = create_document("mediaupload", it)
-            results.append({"file_name": it.file_name, "status": "ok", "id": inserted_id})
+            file_id, stored = await store_file(_base64_chunks(it.data_base64), it.file_name, it.mime_type)
+            # Fields were validated by SYNC_PAYLOAD and stored comes from
+            # store_file, so build the model without validating again
+            fields = dict(it.__dict__)
+            del fields["data_base64"]
+            stored_items.append(MediaUpload.model_construct(**fields, **stored))
+            stored_indexes.append(i)
+            stored_file_ids.append(file_id)
         except Exception as e:
-            results.append({"file_name": it.file_name, "status": "error", "error": str(e)})
+            logger.warning("Sync storage failed for %s: %s", it.file_name, e)
+            if file_id is not None:
+                await _discard_file(file_id)
+            results[i] = {"file_name": it.file_name, "status": "error", "error": str(e)}
+
+    # Metadata for all stored files goes to Mongo in a single round-trip
+    # Per-item errors from create_documents are definite write failures; any
+    # other exception leaves each item's outcome unknown
+    outcome_known = True
+    try:
+        outcomes = await create_documents("mediaupload", stored_items)
+    except Exception as e:
+        outcomes = [(None, str(e))] * len(stored_items)
+        outcome_known = False
+    for i, file_id, item, (inserted_id, error) in zip(stored_indexes, stored_file_ids, stored_items, outcomes):
+        file_name = items[i].file_name
+        if error is None:
+            results[i] = {"file_name": file_name, "status": "ok", "id": inserted_id}
+        else:
+            logger.warning("Sync insert failed for %s: %s", file_name, error)
+            await _discard_file(file_id, None if outcome_known else item.storage_url)
+            results[i] = {"file_name": file_name, "status": "error", "error": error}
     return {"results": results}
 
 # Reviews by officers
 @app.post("/reviews")
-def create_review(item: Review):
-    inserted_id = create_document("review", item)
+async def create_review(item: Review):
+    inserted_id = await create_document("review", item)
     return {"id": inserted_id}
 
 @app.get("/reviews")
-def list_reviews(upload_id: Optional[str] = None, reviewer_phone: Optional[str] = None):
+@cached(ttl=30)
+async def list_reviews(
+    upload_id: Optional[str] = None,
+    reviewer_phone: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    skip: int = Query(0, ge=0),
+):
     filters = {}
     if upload_id:
         try:
@@ -130,17 +342,17 @@ def list_reviews(upload_id: Optional[str] = None, reviewer_phone: Optional[str]
             pass
     if reviewer_phone:
         filters["reviewer_phone"] = reviewer_phone
-    docs = get_documents("review", filters)
-    for d in docs:
-        d["_id"] = str(d.get("_id"))
-    return docs
+    # Newest first per upload, served by the (upload_id, _id) index
+    sort = [("_id", -1)] if "upload_id" in filters else None
+    cursor = find_documents("review", filters, limit=limit, projection=REVIEW_FIELDS, skip=skip, sort=sort)
+    return await stream_json_array(cursor)
 
 # Simple AI validation placeholder endpoint
 class AICheckRequest(BaseModel):
     upload_id: str
 
 @app.post("/ai/validate")
-def ai_validate(req: AICheckRequest):
+async def ai_validate(req: AICheckRequest):
     # Placeholder: in real scenario call AI service for object/scene/fraud checks
     # Here just echo success with dummy score
     return {"upload_id": req.upload_id, "valid": True, "score": 0.87, "flags": []}
@@ -148,4 +360,15 @@ def ai_validate(req: AICheckRequest):
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # Single-process fallback for local runs; production uses gunicorn with
+    # UvicornWorkers (see start_server.sh), letting the kernel accept queue
+    # balance connections across workers.
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=port,
+        loop="uvloop",
+        http="httptools",
+        access_log=False,
+        log_level=LOG_LEVEL,
+    )
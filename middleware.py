@@ -0,0 +1,87 @@
+"""
+ASGI Middleware
+
+Request guards that run before FastAPI parses or validates the body, so
+oversized or mistyped uploads are rejected without buffering them.
+"""
+
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+
+from responses import json_dumps
+
+class UploadGuardMiddleware:
+    """Reject oversized bodies (413) and non-multipart uploads (415) per path.
+
+    Content-Length is checked up front; bodies without it (chunked) are
+    counted as they are received and cut off with an HTTPException, which
+    FastAPI's body parsing re-raises and the exception handler turns into 413.
+    """
+
+    def __init__(self, app, limits: Dict[str, int], multipart_paths: tuple = ()):
+        self.app = app
+        self.limits = limits
+        self.multipart_paths = multipart_paths
+
+    def _limit_for(self, path: str) -> Optional[int]:
+        for prefix, limit in self.limits.items():
+            if path == prefix or path.startswith(prefix + "/"):
+                return limit
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        limit = self._limit_for(path)
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        if path in self.multipart_paths:
+            content_type = headers.get(b"content-type", b"")
+            if not content_type.startswith(b"multipart/form-data"):
+                await _reject(send, 415, "Uploads must be sent as multipart/form-data")
+                return
+
+        content_length = headers.get(b"content-length")
+        if content_length is not None:
+            try:
+                too_large = int(content_length) > limit
+            except ValueError:
+                await _reject(send, 400, "Invalid Content-Length header")
+                return
+            if too_large:
+                await _reject(send, 413, f"Request body exceeds {limit} bytes")
+                return
+            await self.app(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=f"Request body exceeds {limit} bytes")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+async def _reject(send, status: int, detail: str):
+    body = json_dumps({"detail": detail})
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,45 @@
+"""
+Response Helpers
+
+orjson-backed JSON rendering used as the app's default response class.
+Handles Mongo ObjectId values so documents can be returned without copying,
+and streams cursors as JSON arrays without materializing them.
+"""
+
+from typing import Any, AsyncIterable, AsyncIterator
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+
+def _default(obj: Any):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def json_dumps(content: Any) -> bytes:
+    """Serialize content to JSON bytes with orjson"""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+class MongoJSONResponse(ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        return json_dumps(content)
+
+async def _json_array(first: Any, rest: AsyncIterator[Any]):
+    yield b"[" + json_dumps(first)
+    async for doc in rest:
+        yield b"," + json_dumps(doc)
+    yield b"]"
+
+async def stream_json_array(docs: AsyncIterable[Any]) -> Response:
+    """Stream an async iterable (e.g. a Motor cursor) as a JSON array.
+
+    The first item is fetched before responding, so query and connection
+    errors still surface as an error status instead of a truncated 200.
+    """
+    rest = docs.__aiter__()
+    try:
+        first = await rest.__anext__()
+    except StopAsyncIteration:
+        return MongoJSONResponse([])
+    return StreamingResponse(_json_array(first, rest), media_type="application/json")
@@ -11,7 +11,7 @@ Model name is converted to lowercase for the collection name:
 - BlogPost -> "blogs" collection
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 from typing import Optional, List
 from datetime import datetime
 
@@ -34,18 +34,25 @@ class Officer(BaseModel):
     role: str = Field("officer", description="Role: officer/reviewer/admin")
     organization: Optional[str] = Field(None, description="State Agency/Bank name")
 
-class MediaUpload(BaseModel):
+class MediaMetadata(BaseModel):
     beneficiary_phone: str = Field(..., description="Beneficiary mobile number")
     loan_id: Optional[str] = Field(None, description="Loan account/reference ID")
     file_name: str = Field(..., description="Original file name")
     mime_type: str = Field(..., description="MIME type of uploaded file")
-    data_base64: str = Field(..., description="Base64-encoded image/video data")
     latitude: Optional[float] = Field(None, description="Captured latitude")
     longitude: Optional[float] = Field(None, description="Captured longitude")
     accuracy: Optional[float] = Field(None, description="GPS accuracy meters")
     captured_at: Optional[datetime] = Field(None, description="Device-captured timestamp in ISO format")
     notes: Optional[str] = Field(None, description="Notes/description of the asset")
 
+class MediaUpload(MediaMetadata):
+    storage_url: str = Field(..., description="Location of the stored image/video file")
+    size_bytes: int = Field(..., description="Stored file size in bytes")
+    sha256: str = Field(..., description="Hex SHA-256 digest of the stored file")
+
+class OfflineMediaUpload(MediaMetadata):
+    data_base64: str = Field(..., description="Base64-encoded image/video data captured offline")
+
 class Review(BaseModel):
     upload_id: str = Field(..., description="Associated upload ID")
     reviewer_phone: str = Field(..., description="Reviewer mobile number")
@@ -60,7 +67,30 @@ class OTPVerify(BaseModel):
     code: str
 
 class SyncPayload(BaseModel):
-    items: List[MediaUpload]
+    items: List[OfflineMediaUpload]
+
+# Built once at import so /sync parses and validates batches in one
+# pydantic-core pass without per-request schema setup
+SYNC_PAYLOAD = TypeAdapter(SyncPayload)
+
+def _inline_json_schema(model) -> dict:
+    """JSON schema for model with $defs references inlined"""
+    schema = model.model_json_schema()
+    defs = schema.pop("$defs", {})
+
+    def resolve(node):
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return resolve(defs[node["$ref"].rsplit("/", 1)[-1]])
+            return {k: resolve(v) for k, v in node.items()}
+        if isinstance(node, list):
+            return [resolve(v) for v in node]
+        return node
+
+    return resolve(schema)
+
+# /sync reads its body directly, so its OpenAPI request schema is supplied here
+SYNC_PAYLOAD_SCHEMA = _inline_json_schema(SyncPayload)
 
 # Example schemas retained for reference (not used by app runtime)
 class User(BaseModel):
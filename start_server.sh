@@ -2,9 +2,9 @@
 echo "Starting FastAPI backend server..."
 
 # Find and kill MainThread processes
-PIDS=$(ps | grep uvicorn | grep -v grep | awk '{print $1}')
+PIDS=$(ps | grep -E 'uvicorn|gunicorn' | grep -v grep | awk '{print $1}')
 if [ ! -z "$PIDS" ]; then
-  echo "Killing uvicorn processes: $PIDS"
+  echo "Killing server processes: $PIDS"
   for pid in $PIDS; do
     kill $pid 2>/dev/null || true
   done
@@ -15,5 +15,12 @@ mkdir -p logs
 echo "Installing dependencies..."
 pip install -r requirements.txt
 echo "Starting FastAPI server..."
-nohup uvicorn main:app --host 0.0.0.0 --port 8000 --reload > logs/server.log 2>&1 
+# One UvicornWorker (uvloop + httptools) per 2*cores+1; the OS accept queue
+# load-balances connections between workers (or put nginx in front).
+# Access logging stays off (no --access-logfile); request logs belong at the LB.
+# Each worker keeps its own Mongo pool with minPoolSize=10 (database.py), so a
+# host holds about 10*WORKERS idle Mongo connections; size WORKERS accordingly.
+PORT=${PORT:-8000}
+WORKERS=${WORKERS:-$(( 2 * $(nproc) + 1 ))}
+nohup gunicorn main:app -k uvicorn.workers.UvicornWorker -w "$WORKERS" -b 0.0.0.0:"$PORT" --log-level "${LOG_LEVEL:-warning}" > logs/server.log 2>&1 
 echo "Server started in background"
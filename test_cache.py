@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("redis")
+pytest.importorskip("orjson")
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+import cache
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = fakeredis.aioredis.FakeRedis()
+    monkeypatch.setattr(cache, "redis", client)
+    monkeypatch.setattr(cache, "_consume_otp_script", client.register_script(cache._CONSUME_OTP_LUA))
+    monkeypatch.setattr(cache, "CACHE_STATS", {"hits": 0, "misses": 0})
+    return client
+
+@pytest.fixture
+def no_redis(monkeypatch):
+    monkeypatch.setattr(cache, "redis", None)
+    monkeypatch.setattr(cache, "_LOCAL_OTP", {})
+
+async def _read(response):
+    if isinstance(response, StreamingResponse):
+        return b"".join([chunk async for chunk in response.body_iterator])
+    return response.body
+
+def test_cache_miss_then_hit(fake_redis):
+    calls = []
+
+    @cache.cached(ttl=30)
+    async def handler(state=None):
+        calls.append(state)
+        return [{"state": state}]
+
+    async def run():
+        first = await _read(await handler(state="KA"))
+        second = await _read(await handler(state="KA"))
+        other = await _read(await handler(state="TN"))
+        return first, second, other
+
+    first, second, other = asyncio.run(run())
+    assert first == second == b'[{"state":"KA"}]'
+    assert other == b'[{"state":"TN"}]'
+    assert calls == ["KA", "TN"]
+    assert cache.CACHE_STATS == {"hits": 1, "misses": 2}
+
+def test_streamed_body_is_cached_after_it_is_sent(fake_redis):
+    calls = []
+
+    async def chunks():
+        yield b"["
+        yield b'{"a":1}'
+        yield b"]"
+
+    @cache.cached(ttl=30)
+    async def handler(state=None):
+        calls.append(state)
+        return StreamingResponse(chunks(), media_type="application/json")
+
+    async def run():
+        response = await handler(state="KA")
+        assert isinstance(response, StreamingResponse)
+        first = await _read(response)
+        second = await handler(state="KA")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == b'[{"a":1}]'
+    assert isinstance(second, Response) and not isinstance(second, StreamingResponse)
+    assert second.body == first
+    assert len(calls) == 1
+
+def test_cache_fails_open_on_redis_errors(fake_redis, monkeypatch):
+    async def broken(*args, **kwargs):
+        raise RedisConnectionError("down")
+
+    monkeypatch.setattr(fake_redis, "get", broken)
+    monkeypatch.setattr(fake_redis, "set", broken)
+
+    @cache.cached(ttl=30)
+    async def handler(state=None):
+        return [{"state": state}]
+
+    async def run():
+        return await _read(await handler(state="KA"))
+
+    assert asyncio.run(run()) == b'[{"state":"KA"}]'
+    assert cache.CACHE_STATS == {"hits": 0, "misses": 1}
+
+def test_redis_otp_is_consumed_exactly_once(fake_redis):
+    async def run():
+        await cache.store_otp("999", "123456")
+        return await asyncio.gather(*(cache.consume_otp("999", "123456") for _ in range(5)))
+
+    assert sorted(asyncio.run(run())) == [False] * 4 + [True]
+
+def test_redis_wrong_otp_keeps_the_stored_code(fake_redis):
+    async def run():
+        await cache.store_otp("999", "123456")
+        wrong = await cache.consume_otp("999", "000000")
+        right = await cache.consume_otp("999", "123456")
+        return wrong, right
+
+    assert asyncio.run(run()) == (False, True)
+
+def test_redis_otp_has_ttl(fake_redis):
+    async def run():
+        await cache.store_otp("999", "123456", ttl=300)
+        return await fake_redis.ttl("otp:999")
+
+    assert 0 < asyncio.run(run()) <= 300
+
+def test_local_otp_is_consumed_exactly_once(no_redis):
+    async def run():
+        await cache.store_otp("999", "123456")
+        return await cache.consume_otp("999", "123456"), await cache.consume_otp("999", "123456")
+
+    assert asyncio.run(run()) == (True, False)
+
+def test_local_otp_expires(no_redis, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+
+    async def run():
+        await cache.store_otp("999", "123456", ttl=300)
+        now[0] += 301
+        return await cache.consume_otp("999", "123456")
+
+    assert asyncio.run(run()) is False
@@ -0,0 +1,107 @@
+import asyncio
+import inspect
+from datetime import datetime, timezone
+from typing import Union, get_args, get_origin
+
+import pytest
+from pydantic import BaseModel
+
+pytest.importorskip("motor")
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+import database
+import schemas
+
+SCHEMAS = [
+    obj for obj in vars(schemas).values()
+    if inspect.isclass(obj) and issubclass(obj, BaseModel) and obj.__module__ == schemas.__name__
+]
+
+def _sample(annotation):
+    if get_origin(annotation) is Union:
+        return _sample(next(a for a in get_args(annotation) if a is not type(None)))
+    if get_origin(annotation) is list:
+        return [_sample(get_args(annotation)[0])]
+    if inspect.isclass(annotation) and issubclass(annotation, BaseModel):
+        return annotation(**{name: _sample(f.annotation) for name, f in annotation.model_fields.items()})
+    return {
+        str: "value",
+        int: 7,
+        float: 1.5,
+        bool: True,
+        datetime: datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    }[annotation]
+
+@pytest.mark.parametrize("model_cls", SCHEMAS, ids=lambda cls: cls.__name__)
+def test_to_document_matches_model_dump(model_cls):
+    item = model_cls(**{name: _sample(f.annotation) for name, f in model_cls.model_fields.items()})
+    assert database._to_document(item) == item.model_dump()
+
+@pytest.mark.parametrize("model_cls", SCHEMAS, ids=lambda cls: cls.__name__)
+def test_to_document_matches_model_dump_with_defaults(model_cls):
+    required = {name: _sample(f.annotation) for name, f in model_cls.model_fields.items() if f.is_required()}
+    item = model_cls(**required)
+    assert database._to_document(item) == item.model_dump()
+
+def test_to_document_returns_a_copy():
+    item = schemas.Beneficiary(phone="1", name="a")
+    doc = database._to_document(item)
+    doc["created_at"] = "x"
+    assert "created_at" not in item.__dict__
+
+def test_nested_models_are_not_flat():
+    assert not database._is_flat(schemas.SyncPayload)
+    assert database._is_flat(schemas.Beneficiary)
+
+class _FakeCollection:
+    """insert_many stand-in that rejects documents whose phone starts with 'dup'"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def insert_many(self, docs, ordered=True):
+        self.calls.append((docs, ordered))
+        write_errors = []
+        for i, doc in enumerate(docs):
+            doc.setdefault("_id", ObjectId())
+            if doc["phone"].startswith("dup"):
+                write_errors.append({"index": i, "code": 11000, "errmsg": f"E11000 duplicate key {doc['phone']}"})
+        if write_errors:
+            raise BulkWriteError({"writeErrors": write_errors, "nInserted": len(docs) - len(write_errors)})
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    collection = _FakeCollection()
+    monkeypatch.setattr(database, "db", {"beneficiary": collection})
+    return collection
+
+def test_create_documents_maps_bulk_write_errors_by_index(fake_db):
+    items = [
+        schemas.Beneficiary(phone="1", name="a"),
+        schemas.Beneficiary(phone="dup-2", name="b"),
+        {"phone": "3", "name": "c"},
+        schemas.Beneficiary(phone="dup-4", name="d"),
+    ]
+    outcomes = asyncio.run(database.create_documents("beneficiary", items))
+
+    docs, ordered = fake_db.calls[0]
+    assert ordered is False
+    assert len(fake_db.calls) == 1
+    assert [error is None for _, error in outcomes] == [True, False, True, False]
+    assert outcomes[0][0] == str(docs[0]["_id"])
+    assert outcomes[2][0] == str(docs[2]["_id"])
+    assert "dup-2" in outcomes[1][1] and outcomes[1][0] is None
+    assert "dup-4" in outcomes[3][1] and outcomes[3][0] is None
+
+def test_create_documents_stamps_timestamps_without_mutating_input(fake_db):
+    raw = {"phone": "1", "name": "a"}
+    asyncio.run(database.create_documents("beneficiary", [raw]))
+    doc = fake_db.calls[0][0][0]
+    assert doc["created_at"] == doc["updated_at"]
+    assert raw == {"phone": "1", "name": "a"}
+
+def test_create_documents_empty_batch_skips_insert(fake_db):
+    assert asyncio.run(database.create_documents("beneficiary", [])) == []
+    assert fake_db.calls == []
@@ -0,0 +1,78 @@
+import asyncio
+import base64
+import os
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("motor")
+pytest.importorskip("redis")
+pytest.importorskip("orjson")
+
+import main
+
+def _decode(data: str) -> bytes:
+    async def collect():
+        return b"".join([chunk async for chunk in main._base64_chunks(data)])
+    return asyncio.run(collect())
+
+def test_base64_chunks_plain():
+    raw = os.urandom(2 * 1024 * 1024 + 7)
+    assert _decode(base64.b64encode(raw).decode()) == raw
+
+def test_base64_chunks_line_wrapped():
+    raw = os.urandom(2 * 1024 * 1024 + 7)
+    assert _decode(base64.encodebytes(raw).decode()) == raw
+
+def test_base64_chunks_data_uri():
+    raw = os.urandom(1000)
+    assert _decode("data:image/jpeg;base64," + base64.b64encode(raw).decode()) == raw
+
+def test_base64_chunks_truncated():
+    with pytest.raises(ValueError):
+        _decode("QUJD" + "QQ")
+
+class _RawRequest:
+    def __init__(self, body: bytes):
+        self._body = body
+
+    async def body(self):
+        return self._body
+
+@pytest.mark.parametrize("body, loc, error_type", [
+    (b"{bad", ("body",), "json_invalid"),
+    (b"{}", ("body", "items"), "missing"),
+    (b'{"items": [1]}', ("body", "items", 0), "model_type"),
+    (b'{"items": [{"file_name": "a"}]}', ("body", "items", 0, "beneficiary_phone"), "missing"),
+])
+def test_sync_validation_errors(body, loc, error_type):
+    with pytest.raises(main.RequestValidationError) as exc_info:
+        asyncio.run(main.sync_offline(_RawRequest(body)))
+    first = exc_info.value.errors()[0]
+    assert first["loc"] == loc
+    assert first["type"] == error_type
+
+def test_startup_does_not_wait_for_indexes(monkeypatch):
+    started = asyncio.Event()
+
+    async def slow_indexes():
+        started.set()
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(main, "ensure_indexes", slow_indexes)
+
+    async def run():
+        await asyncio.wait_for(main.create_indexes(), timeout=1)
+        await asyncio.wait_for(started.wait(), timeout=1)
+        for task in list(main._background_tasks):
+            task.cancel()
+
+    asyncio.run(run())
+
+def test_index_errors_are_logged(monkeypatch, caplog):
+    async def failing_indexes():
+        raise main.PyMongoError("duplicate key")
+
+    monkeypatch.setattr(main, "ensure_indexes", failing_indexes)
+    asyncio.run(main._create_indexes())
+    assert "Index creation failed" in caplog.text
@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("orjson")
+
+from fastapi import FastAPI, Request
+
+from middleware import UploadGuardMiddleware
+
+LIMIT = 100
+
+def _make_app():
+    app = FastAPI()
+    app.add_middleware(UploadGuardMiddleware, limits={"/uploads": LIMIT, "/sync": LIMIT}, multipart_paths=("/uploads",))
+
+    @app.post("/uploads")
+    async def uploads(request: Request):
+        return {"size": len(await request.body())}
+
+    @app.post("/sync")
+    async def sync(request: Request):
+        return {"size": len(await request.body())}
+
+    @app.post("/other")
+    async def other(request: Request):
+        return {"size": len(await request.body())}
+
+    return app
+
+def _call(path, chunks, headers=()):
+    """Drive the app over raw ASGI, returning (status, parsed JSON body)"""
+    app = _make_app()
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(k.encode(), v.encode()) for k, v in headers],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+    asyncio.run(app(scope, receive, send))
+    status = next(m["status"] for m in sent if m["type"] == "http.response.start")
+    body = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    return status, json.loads(body)
+
+MULTIPART = ("content-type", "multipart/form-data; boundary=x")
+
+def test_rejects_oversized_content_length():
+    status, body = _call("/sync", [b"{}"], [("content-type", "application/json"), ("content-length", str(LIMIT + 1))])
+    assert status == 413
+    assert "exceeds" in body["detail"]
+
+def test_allows_body_within_limit():
+    status, body = _call("/sync", [b"x" * LIMIT], [("content-length", str(LIMIT))])
+    assert status == 200
+    assert body == {"size": LIMIT}
+
+def test_rejects_oversized_chunked_body():
+    status, body = _call("/sync", [b"x" * 60, b"x" * 60], [("transfer-encoding", "chunked")])
+    assert status == 413
+    assert "exceeds" in body["detail"]
+
+def test_allows_chunked_body_within_limit():
+    status, body = _call("/sync", [b"x" * 40, b"x" * 40], [("transfer-encoding", "chunked")])
+    assert status == 200
+    assert body == {"size": 80}
+
+def test_rejects_non_multipart_upload():
+    status, _ = _call("/uploads", [b"{}"], [("content-type", "application/json"), ("content-length", "2")])
+    assert status == 415
+
+def test_allows_multipart_upload():
+    status, _ = _call("/uploads", [b"data"], [MULTIPART, ("content-length", "4")])
+    assert status == 200
+
+def test_rejects_invalid_content_length():
+    status, _ = _call("/sync", [b"{}"], [("content-length", "abc")])
+    assert status == 400
+
+def test_unguarded_paths_pass_through():
+    status, body = _call("/other", [b"x" * (LIMIT * 2)], [("content-length", str(LIMIT * 2))])
+    assert status == 200
+    assert body == {"size": LIMIT * 2}